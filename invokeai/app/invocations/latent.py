@@ -1,11 +1,13 @@
 # Copyright (c) 2023 Kyle Schouviller (https://github.com/kyle0654)
 import inspect
 import math
-from contextlib import ExitStack
+import weakref
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager, nullcontext
+from copy import deepcopy
 from functools import singledispatchmethod
 from typing import Any, Iterator, List, Literal, Optional, Tuple, Union
 
-import einops
 import numpy as np
 import numpy.typing as npt
 import torch
@@ -13,7 +15,6 @@ import torchvision
 import torchvision.transforms as T
 from diffusers import AutoencoderKL, AutoencoderTiny
 from diffusers.configuration_utils import ConfigMixin
-from diffusers.image_processor import VaeImageProcessor
 from diffusers.models.adapter import T2IAdapter
 from diffusers.models.attention_processor import (
     AttnProcessor2_0,
@@ -24,6 +25,7 @@ from diffusers.models.attention_processor import (
 from diffusers.models.unets.unet_2d_condition import UNet2DConditionModel
 from diffusers.schedulers import DPMSolverSDEScheduler
 from diffusers.schedulers import SchedulerMixin as Scheduler
+from diffusers.utils.import_utils import is_xformers_available
 from PIL import Image, ImageFilter
 from pydantic import field_validator
 from torchvision.transforms.functional import resize as tv_resize
@@ -46,6 +48,7 @@ from invokeai.app.invocations.fields import (
 from invokeai.app.invocations.ip_adapter import IPAdapterField
 from invokeai.app.invocations.primitives import DenoiseMaskOutput, ImageOutput, LatentsOutput
 from invokeai.app.invocations.t2i_adapter import T2IAdapterField
+from invokeai.app.services.config.config_default import get_config
 from invokeai.app.services.shared.invocation_context import InvocationContext
 from invokeai.app.util.controlnet_utils import prepare_control_image
 from invokeai.backend.ip_adapter.ip_adapter import IPAdapter, IPAdapterPlus
@@ -79,6 +82,159 @@ from .model import ModelIdentifierField, UNetField, VAEField
 
 DEFAULT_PRECISION = TorchDevice.choose_torch_dtype()
 
+if hasattr(torch, "_dynamo"):
+    # Graph breaks or backend failures inside the compiled UNet/VAE wrappers below should fall back to eager
+    # execution rather than abort a generation. Set once at import, next to this module's torch.compile call sites.
+    torch._dynamo.config.suppress_errors = True
+
+# Instance attribute under which a UNet's torch.compile wrapper is cached, together with the data pointer of a probe
+# parameter recorded at compile time. The wrapper is stored in the eager module's __dict__ rather than in a
+# module-level mapping: the wrapper holds a strong reference to the eager module (via _orig_mod), so any global
+# cache would root the module through its value and pin evicted models in memory forever. As an instance attribute
+# the wrapper and module form a plain reference cycle that the garbage collector frees when the model cache drops
+# the module. __dict__ is used directly because nn.Module.__setattr__ would otherwise register the wrapper as a
+# child module, breaking .to()/state_dict recursion.
+_COMPILED_UNET_ATTR = "_invokeai_compiled_wrapper"
+
+
+def _compile_unet(unet: UNet2DConditionModel) -> UNet2DConditionModel:
+    """Wrap a UNet with torch.compile, re-using a cached wrapper when one exists for this module.
+
+    TorchInductor fuses the UNet's pointwise ops and (with mode="reduce-overhead") captures CUDA graphs, removing most
+    of the per-step kernel launch overhead of the denoising loop. The recorded graphs capture the parameters by data
+    pointer, so a cached wrapper is only re-used while the weights still occupy the same storage; a model-cache
+    offload/re-upload cycle reallocates every parameter and forces a recompile. Compilation is only attempted on CUDA
+    devices. If torch.compile is unavailable or fails, the eager module is returned unchanged.
+    """
+    if unet.device.type != "cuda" or not hasattr(torch, "compile"):
+        return unet
+
+    cached = unet.__dict__.get(_COMPILED_UNET_ATTR, None)
+    if cached is not None:
+        cached_ptr, compiled = cached
+        if cached_ptr == unet.conv_in.weight.data_ptr():
+            return compiled
+        # The model cache offloaded this UNet to CPU and re-uploaded it since compilation; replaying the recorded
+        # cudagraphs would read the old, freed parameter storage.
+        del unet.__dict__[_COMPILED_UNET_ATTR]
+
+    try:
+        # channels_last keeps the conv layers Tensor-Core aligned, which inductor takes advantage of.
+        unet.to(memory_format=torch.channels_last)
+        compiled = torch.compile(unet, mode="reduce-overhead", fullgraph=False)
+    except Exception:
+        # torch.compile is not supported on all platforms (e.g. triton may be missing). Fall back to eager.
+        return unet
+
+    # Record the probe pointer after the channels_last conversion, which may itself reallocate the weights.
+    unet.__dict__[_COMPILED_UNET_ATTR] = (unet.conv_in.weight.data_ptr(), compiled)
+    return compiled
+
+
+# Cache of torch.compile()-wrapped VAE decoders, keyed weakly on the owning VAE. Each entry pairs the wrapper with
+# the data pointer of a probe parameter recorded at compile time, like the UNet cache above. Unlike the UNet
+# wrapper, the compiled decoder references only the child decoder module, not the VAE used as the key, so entries
+# are dropped when the model cache evicts the VAE.
+_COMPILED_VAE_DECODERS: "weakref.WeakKeyDictionary[torch.nn.Module, Tuple[int, torch.nn.Module]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@contextmanager
+def _compiled_vae_decoder(vae: torch.nn.Module) -> Iterator[None]:
+    """Temporarily swap the VAE's decoder for a torch.compile-wrapped version.
+
+    Inductor fuses the decoder's conv/groupnorm/SiLU chains, cutting the kernel launch overhead of the single large
+    decode call. The compiled wrapper is cached per VAE so repeat invocations re-use the traced graphs, but only
+    while the decoder's weights still occupy the storage they were compiled against - a model-cache offload/re-upload
+    cycle reallocates the parameters out from under the recorded cudagraphs and forces a recompile. On non-CUDA
+    devices, or when torch.compile is unavailable or fails, the decoder is left untouched.
+    """
+    decoder = getattr(vae, "decoder", None)
+    device = getattr(vae, "device", None)
+    probe = next(decoder.parameters(), None) if decoder is not None else None
+    if probe is None or device is None or device.type != "cuda" or not hasattr(torch, "compile"):
+        yield
+        return
+
+    compiled = None
+    cached = _COMPILED_VAE_DECODERS.get(vae, None)
+    if cached is not None:
+        cached_ptr, cached_decoder = cached
+        if cached_ptr == probe.data_ptr():
+            compiled = cached_decoder
+
+    if compiled is None:
+        try:
+            vae.to(memory_format=torch.channels_last)
+            compiled = torch.compile(decoder, mode="reduce-overhead", fullgraph=False)
+        except Exception:
+            yield
+            return
+        # Record the probe pointer after the channels_last conversion, which may itself reallocate the weights.
+        _COMPILED_VAE_DECODERS[vae] = (next(decoder.parameters()).data_ptr(), compiled)
+
+    vae.decoder = compiled
+    try:
+        yield
+    finally:
+        vae.decoder = decoder
+
+
+# Small LRU cache of prepared ControlNet image tensors. Interactive workflows re-run the same control image with
+# unchanged settings on every invocation, repeating the PIL resize / normalize / CFG-duplication work each time.
+# Image names are unique per image, so a prepared tensor can be re-used as long as the prep parameters match. The
+# cache is kept deliberately tiny because entries may be device-resident.
+_PREPARED_CONTROL_IMAGE_CACHE: "OrderedDict[Tuple[Any, ...], torch.Tensor]" = OrderedDict()
+_PREPARED_CONTROL_IMAGE_CACHE_MAX_SIZE = 4
+
+
+def _enable_inplace_decoder_activations(vae: torch.nn.Module) -> None:
+    """Switch the VAE decoder's SiLU activations to in-place mode.
+
+    Every SiLU in the decoder consumes a freshly-computed GroupNorm (or conv) output that has no other readers, so
+    mutating it in place is safe and halves the activation memory traffic of each norm+act stack. This only matters
+    for the eager/tiled path - when the decoder is compiled, Inductor fuses the GroupNorm+SiLU pairs into single
+    kernels anyway.
+    """
+    decoder = getattr(vae, "decoder", None)
+    if decoder is None:
+        return
+    for module in decoder.modules():
+        if isinstance(module, torch.nn.SiLU):
+            module.inplace = True
+
+
+def _apply_vae_attention_processor(vae: torch.nn.Module) -> None:
+    """Install the best available fused attention processor on the VAE's attention blocks.
+
+    The fp32-cast checks in the encode/decode paths only inspect the current processor; this makes sure the VAE is
+    actually using a fused xFormers/SDP kernel rather than falling back to eager attention.
+    """
+    if not hasattr(vae, "set_attn_processor"):
+        # AutoencoderTiny has no attention blocks.
+        return
+    try:
+        if get_config().attention_type == "xformers" and is_xformers_available():
+            vae.enable_xformers_memory_efficient_attention()
+        elif hasattr(torch.nn.functional, "scaled_dot_product_attention"):
+            vae.set_attn_processor(AttnProcessor2_0())
+    except Exception:
+        # Keep whatever processor diffusers installed by default.
+        pass
+
+
+def _to_device_non_blocking(tensor: torch.Tensor, device: torch.device, dtype: torch.dtype) -> torch.Tensor:
+    """Copy a tensor to the target device/dtype, overlapping the host-to-device transfer with other work.
+
+    CPU tensors bound for a CUDA device are staged through pinned memory so the copy can run asynchronously on the
+    transfer engine. The copies are stream-ordered with respect to subsequent kernels, so no explicit synchronization
+    is needed before the tensors are consumed.
+    """
+    if tensor.device.type == "cpu" and device.type == "cuda":
+        tensor = tensor.pin_memory()
+    return tensor.to(device=device, dtype=dtype, non_blocking=True)
+
 
 @invocation_output("scheduler_output")
 class SchedulerOutput(BaseInvocationOutput):
@@ -239,6 +395,28 @@ class CreateGradientMaskInvocation(BaseInvocation):
         )
 
 
+# Prototype schedulers, keyed on (scheduler model key, scheduler name, seed). Rebuilding a scheduler from its config
+# on every invocation is redundant when these inputs are unchanged. Callers receive a deep copy so that
+# set_timesteps() mutations never leak into the cache. Only dpmpp_sde bakes its noise sampler seed into the config;
+# all other schedulers are seed-independent and share one entry (keyed with seed 0) per (model, name).
+_SCHEDULER_CACHE: dict[Tuple[str, str, int], Scheduler] = {}
+_SCHEDULER_CACHE_MAX_SIZE = 16
+
+# Scheduler-step generators, keyed on device string. Constructing a torch.Generator allocates fresh generator state
+# (a CUDA context touch on GPU devices) on every invocation; reseeding an existing generator is equivalent and free.
+# Session execution is serialized, so a single generator per device cannot be contended.
+_SCHEDULER_STEP_GENERATORS: dict[str, torch.Generator] = {}
+
+
+def _get_seeded_generator(device: torch.device, seed: int) -> torch.Generator:
+    """Return a per-device cached generator, reseeded to the given seed."""
+    generator = _SCHEDULER_STEP_GENERATORS.get(str(device))
+    if generator is None:
+        generator = torch.Generator(device=device)
+        _SCHEDULER_STEP_GENERATORS[str(device)] = generator
+    return generator.manual_seed(seed)
+
+
 def get_scheduler(
     context: InvocationContext,
     scheduler_info: ModelIdentifierField,
@@ -246,6 +424,13 @@ def get_scheduler(
     seed: int,
 ) -> Scheduler:
     scheduler_class, scheduler_extra_config = SCHEDULER_MAP.get(scheduler_name, SCHEDULER_MAP["ddim"])
+
+    # Only dpmpp_sde bakes the seed into its config; for every other scheduler a per-seed key would miss on each
+    # generation (seeds are randomized by default) and the cache would never pay off.
+    cache_key = (scheduler_info.key, scheduler_name, seed if scheduler_class is DPMSolverSDEScheduler else 0)
+    cached_scheduler = _SCHEDULER_CACHE.get(cache_key)
+    if cached_scheduler is not None:
+        return deepcopy(cached_scheduler)
     orig_scheduler_info = context.models.load(scheduler_info)
     with orig_scheduler_info as orig_scheduler:
         scheduler_config = orig_scheduler.config
@@ -268,6 +453,11 @@ def get_scheduler(
     if not hasattr(scheduler, "uses_inpainting_model"):
         scheduler.uses_inpainting_model = lambda: False
     assert isinstance(scheduler, Scheduler)
+
+    if len(_SCHEDULER_CACHE) >= _SCHEDULER_CACHE_MAX_SIZE:
+        # Evict the oldest entry (dicts are insertion-ordered).
+        _SCHEDULER_CACHE.pop(next(iter(_SCHEDULER_CACHE)))
+    _SCHEDULER_CACHE[cache_key] = deepcopy(scheduler)
     return scheduler
 
 
@@ -276,7 +466,7 @@ def get_scheduler(
     title="Denoise Latents",
     tags=["latents", "denoise", "txt2img", "t2i", "t2l", "img2img", "i2i", "l2l"],
     category="latents",
-    version="1.5.3",
+    version="1.5.5",
 )
 class DenoiseLatentsInvocation(BaseInvocation):
     """Denoises noisy latents to decodable images"""
@@ -349,6 +539,16 @@ class DenoiseLatentsInvocation(BaseInvocation):
         input=Input.Connection,
         ui_order=8,
     )
+    quantize_unet: bool = InputField(
+        default=False,
+        description="Quantize the UNet's attention and feed-forward layers to 8-bit for lower memory use and faster inference. Requires the bitsandbytes package and a CUDA device.",
+        ui_order=9,
+    )
+    keep_on_device: bool = InputField(
+        default=False,
+        description="Keep the result latents on the execution device instead of offloading them to the CPU. Speeds up directly-connected downstream nodes at the cost of holding the latents in VRAM.",
+        ui_order=10,
+    )
 
     @field_validator("cfg_scale")
     def ge_one(cls, v: Union[List[float], float]) -> Union[List[float], float]:
@@ -591,24 +791,41 @@ class DenoiseLatentsInvocation(BaseInvocation):
 
             # control_models.append(control_model)
             control_image_field = control_info.image
-            input_image = context.images.get_pil(control_image_field.image_name)
-            # self.image.image_type, self.image.image_name
-            # FIXME: still need to test with different widths, heights, devices, dtypes
-            #        and add in batch_size, num_images_per_prompt?
-            #        and do real check for classifier_free_guidance?
-            # prepare_control_image should return torch.Tensor of shape(batch_size, 3, height, width)
-            control_image = prepare_control_image(
-                image=input_image,
-                do_classifier_free_guidance=do_classifier_free_guidance,
-                width=control_width_resize,
-                height=control_height_resize,
-                # batch_size=batch_size * num_images_per_prompt,
-                # num_images_per_prompt=num_images_per_prompt,
-                device=control_model.device,
-                dtype=control_model.dtype,
-                control_mode=control_info.control_mode,
-                resize_mode=control_info.resize_mode,
+            cache_key = (
+                control_image_field.image_name,
+                control_width_resize,
+                control_height_resize,
+                control_info.control_mode,
+                control_info.resize_mode,
+                str(control_model.device),
+                str(control_model.dtype),
+                do_classifier_free_guidance,
             )
+            control_image = _PREPARED_CONTROL_IMAGE_CACHE.get(cache_key)
+            if control_image is not None:
+                _PREPARED_CONTROL_IMAGE_CACHE.move_to_end(cache_key)
+            else:
+                input_image = context.images.get_pil(control_image_field.image_name)
+                # self.image.image_type, self.image.image_name
+                # FIXME: still need to test with different widths, heights, devices, dtypes
+                #        and add in batch_size, num_images_per_prompt?
+                #        and do real check for classifier_free_guidance?
+                # prepare_control_image should return torch.Tensor of shape(batch_size, 3, height, width)
+                control_image = prepare_control_image(
+                    image=input_image,
+                    do_classifier_free_guidance=do_classifier_free_guidance,
+                    width=control_width_resize,
+                    height=control_height_resize,
+                    # batch_size=batch_size * num_images_per_prompt,
+                    # num_images_per_prompt=num_images_per_prompt,
+                    device=control_model.device,
+                    dtype=control_model.dtype,
+                    control_mode=control_info.control_mode,
+                    resize_mode=control_info.resize_mode,
+                )
+                _PREPARED_CONTROL_IMAGE_CACHE[cache_key] = control_image
+                if len(_PREPARED_CONTROL_IMAGE_CACHE) > _PREPARED_CONTROL_IMAGE_CACHE_MAX_SIZE:
+                    _PREPARED_CONTROL_IMAGE_CACHE.popitem(last=False)
             control_item = ControlNetData(
                 model=control_model,  # model object
                 image_tensor=control_image,
@@ -786,13 +1003,21 @@ class DenoiseLatentsInvocation(BaseInvocation):
         # skip greater order timesteps
         _timesteps = timesteps[:: scheduler.order]
 
+        # The timesteps are monotonically decreasing, so the number of entries >= a threshold can be found by binary
+        # search over the ascending (flipped) view instead of comparing every element.
         # get start timestep index
         t_start_val = int(round(scheduler.config["num_train_timesteps"] * (1 - denoising_start)))
-        t_start_idx = len(list(filter(lambda ts: ts >= t_start_val, _timesteps)))
+        t_start_idx = int(
+            _timesteps.numel() - torch.searchsorted(_timesteps.flip(0), _timesteps.new_tensor(t_start_val))
+        )
 
         # get end timestep index
         t_end_val = int(round(scheduler.config["num_train_timesteps"] * (1 - denoising_end)))
-        t_end_idx = len(list(filter(lambda ts: ts >= t_end_val, _timesteps[t_start_idx:])))
+        remaining_timesteps = _timesteps[t_start_idx:]
+        t_end_idx = int(
+            remaining_timesteps.numel()
+            - torch.searchsorted(remaining_timesteps.flip(0), remaining_timesteps.new_tensor(t_end_val))
+        )
 
         # apply order to indexes
         t_start_idx *= scheduler.order
@@ -808,7 +1033,7 @@ class DenoiseLatentsInvocation(BaseInvocation):
             # At some point, someone decided that schedulers that accept a generator should use the original seed with
             # all bits flipped. I don't know the original rationale for this, but now we must keep it like this for
             # reproducibility.
-            scheduler_step_kwargs = {"generator": torch.Generator(device=device).manual_seed(seed ^ 0xFFFFFFFF)}
+            scheduler_step_kwargs = {"generator": _get_seeded_generator(device, seed ^ 0xFFFFFFFF)}
 
         return num_inference_steps, timesteps, init_timestep, scheduler_step_kwargs
 
@@ -818,12 +1043,16 @@ class DenoiseLatentsInvocation(BaseInvocation):
         if self.denoise_mask is None:
             return None, None, False
 
+        device = TorchDevice.choose_torch_device()
         mask = context.tensors.load(self.denoise_mask.mask_name)
+        # Upload the full-resolution mask first and resize on the execution device - the bilinear interpolation is
+        # much cheaper there than on the CPU, and the mask is headed to the device for denoising anyway.
+        mask = mask.to(device=device)
         mask = tv_resize(mask, latents.shape[-2:], T.InterpolationMode.BILINEAR, antialias=False)
         if self.denoise_mask.masked_latents_name is not None:
             masked_latents = context.tensors.load(self.denoise_mask.masked_latents_name)
         else:
-            masked_latents = torch.where(mask < 0.5, 0.0, latents)
+            masked_latents = torch.where(mask < 0.5, 0.0, latents.to(device=device))
 
         return 1 - mask, masked_latents, self.denoise_mask.gradient
 
@@ -886,15 +1115,46 @@ class DenoiseLatentsInvocation(BaseInvocation):
                 unet_info as unet,
                 # Apply the LoRA after unet has been moved to its target device for faster patching.
                 ModelPatcher.apply_lora_unet(unet, _lora_loader()),
+                # Quantization must come after LoRA patching so the patched weights are what gets quantized.
+                ModelPatcher.apply_unet_8bit_quantization(unet) if self.quantize_unet else nullcontext(),
             ):
                 assert isinstance(unet, UNet2DConditionModel)
-                latents = latents.to(device=unet.device, dtype=unet.dtype)
+                # The compiled wrapper replays graphs cached across invocations, but seamless tiling, FreeU,
+                # IP-Adapters, regional prompting and the non-default attention backends all patch the eager module
+                # by plain attribute mutation (conv forwards, block attributes, attention processors) that dynamo
+                # does not guard, so a cached graph could silently run without - or with stale - patches. Only
+                # compile when none of those are in play. The quantized path is likewise left eager, since the
+                # temporarily swapped-in 8-bit modules would invalidate the cached graphs. LoRA patching is safe: it
+                # mutates the eager module's weights in place, so the patched weights remain visible to the compiled
+                # wrapper.
+                cond_fields = (
+                    self.positive_conditioning
+                    if isinstance(self.positive_conditioning, list)
+                    else [self.positive_conditioning]
+                )
+                uncond_fields = (
+                    self.negative_conditioning
+                    if isinstance(self.negative_conditioning, list)
+                    else [self.negative_conditioning]
+                )
+                use_regional_prompting = any(field.mask is not None for field in cond_fields + uncond_fields)
+                use_compiled_unet = (
+                    not self.quantize_unet
+                    and not self.unet.seamless_axes
+                    and self.unet.freeu_config is None
+                    and not self.ip_adapter
+                    and not use_regional_prompting
+                    and context.config.get().attention_type == "auto"
+                )
+                if use_compiled_unet:
+                    unet = _compile_unet(unet)
+                latents = _to_device_non_blocking(latents, device=unet.device, dtype=unet.dtype)
                 if noise is not None:
-                    noise = noise.to(device=unet.device, dtype=unet.dtype)
+                    noise = _to_device_non_blocking(noise, device=unet.device, dtype=unet.dtype)
                 if mask is not None:
-                    mask = mask.to(device=unet.device, dtype=unet.dtype)
+                    mask = _to_device_non_blocking(mask, device=unet.device, dtype=unet.dtype)
                 if masked_latents is not None:
-                    masked_latents = masked_latents.to(device=unet.device, dtype=unet.dtype)
+                    masked_latents = _to_device_non_blocking(masked_latents, device=unet.device, dtype=unet.dtype)
 
                 scheduler = get_scheduler(
                     context=context,
@@ -956,8 +1216,10 @@ class DenoiseLatentsInvocation(BaseInvocation):
                 )
 
             # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
-            result_latents = result_latents.to("cpu")
-            TorchDevice.empty_cache()
+            if not self.keep_on_device:
+                result_latents = result_latents.to("cpu")
+                if context.config.get().aggressive_empty_cache:
+                    TorchDevice.empty_cache()
 
             name = context.tensors.save(tensor=result_latents)
         return LatentsOutput.build(latents_name=name, latents=result_latents, seed=None)
@@ -992,7 +1254,10 @@ class LatentsToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
         assert isinstance(vae_info.model, (UNet2DConditionModel, AutoencoderKL, AutoencoderTiny))
         with set_seamless(vae_info.model, self.vae.seamless_axes), vae_info as vae:
             assert isinstance(vae, torch.nn.Module)
+            _apply_vae_attention_processor(vae)
+            _enable_inplace_decoder_activations(vae)
             latents = latents.to(vae.device)
+            decode_autocast = nullcontext()
             if self.fp32:
                 vae.to(dtype=torch.float32)
 
@@ -1014,11 +1279,18 @@ class LatentsToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
                 else:
                     latents = latents.float()
 
+            elif vae.device.type == "cuda" and torch.cuda.get_device_capability(vae.device)[0] >= 8:
+                # On Ampere and newer, run the decoder under BF16 autocast with FP32 weights: the conv layers run in
+                # BF16 for Tensor-Core throughput and halved activation bandwidth, while normalization stays in FP32
+                # for stability.
+                vae.to(dtype=torch.float32)
+                decode_autocast = torch.autocast(device_type="cuda", dtype=torch.bfloat16)
             else:
                 vae.to(dtype=torch.float16)
                 latents = latents.half()
 
-            if self.tiled or context.config.get().force_tiled_decode:
+            tiled = self.tiled or context.config.get().force_tiled_decode
+            if tiled:
                 vae.enable_tiling()
             else:
                 vae.disable_tiling()
@@ -1026,17 +1298,26 @@ class LatentsToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
             # clear memory as vae decode can request a lot
             TorchDevice.empty_cache()
 
-            with torch.inference_mode():
+            # Tiled decode runs the decoder once per tile with varying shapes, which defeats cudagraph capture, and
+            # seamless decode patches conv forwards in a way the cached graphs would not see (dynamo does not guard
+            # method swaps), so only the plain non-tiled path is compiled.
+            decoder_ctx = _compiled_vae_decoder(vae) if not tiled and not self.vae.seamless_axes else nullcontext()
+
+            with decoder_ctx, torch.inference_mode():
                 # copied from diffusers pipeline
                 latents = latents / vae.config.scaling_factor
-                image = vae.decode(latents, return_dict=False)[0]
-                image = (image / 2 + 0.5).clamp(0, 1)  # denormalize
-                # we always cast to float32 as this does not cause significant overhead and is compatible with bfloat16
-                np_image = image.cpu().permute(0, 2, 3, 1).float().numpy()
+                with decode_autocast:
+                    image = vae.decode(latents, return_dict=False)[0]
+                # Denormalize in place and quantize to uint8 on the device, so a single NHWC uint8 buffer is all that
+                # crosses to the host. This matches VaeImageProcessor.numpy_to_pil's (x * 255).round() quantization
+                # while copying ~6x less data than the old float32 round-trip.
+                image = image.mul_(0.5).add_(0.5).clamp_(0, 1).mul_(255).round_().to(torch.uint8)
+                np_image = image.permute(0, 2, 3, 1).contiguous().cpu().numpy()
 
-                image = VaeImageProcessor.numpy_to_pil(np_image)[0]
+                image = Image.fromarray(np_image[0])
 
-        TorchDevice.empty_cache()
+        if context.config.get().aggressive_empty_cache:
+            TorchDevice.empty_cache()
 
         image_dto = context.images.save(image=image)
 
@@ -1084,10 +1365,15 @@ class ResizeLatentsInvocation(BaseInvocation):
             antialias=self.antialias if self.mode in ["bilinear", "bicubic"] else False,
         )
 
-        # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
-        resized_latents = resized_latents.to("cpu")
+        # If the input latents were already device-resident (an upstream node kept them on the GPU), leave the result
+        # on the device too: the tensor service's forward cache hands the in-memory tensor straight to the next node,
+        # so a CPU round-trip would only add two full-tensor copies.
+        if latents.device.type == "cpu":
+            # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
+            resized_latents = resized_latents.to("cpu")
 
-        TorchDevice.empty_cache()
+            if context.config.get().aggressive_empty_cache:
+                TorchDevice.empty_cache()
 
         name = context.tensors.save(tensor=resized_latents)
         return LatentsOutput.build(latents_name=name, latents=resized_latents, seed=self.latents.seed)
@@ -1124,9 +1410,13 @@ class ScaleLatentsInvocation(BaseInvocation):
             antialias=self.antialias if self.mode in ["bilinear", "bicubic"] else False,
         )
 
-        # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
-        resized_latents = resized_latents.to("cpu")
-        TorchDevice.empty_cache()
+        # If the input latents were already device-resident, keep the result on the device as well (see
+        # ResizeLatentsInvocation for rationale).
+        if latents.device.type == "cpu":
+            # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
+            resized_latents = resized_latents.to("cpu")
+            if context.config.get().aggressive_empty_cache:
+                TorchDevice.empty_cache()
 
         name = context.tensors.save(tensor=resized_latents)
         return LatentsOutput.build(latents_name=name, latents=resized_latents, seed=self.latents.seed)
@@ -1156,7 +1446,9 @@ class ImageToLatentsInvocation(BaseInvocation):
     def vae_encode(vae_info: LoadedModel, upcast: bool, tiled: bool, image_tensor: torch.Tensor) -> torch.Tensor:
         with vae_info as vae:
             assert isinstance(vae, torch.nn.Module)
+            _apply_vae_attention_processor(vae)
             orig_dtype = vae.dtype
+            encode_autocast = nullcontext()
             if upcast:
                 vae.to(dtype=torch.float32)
 
@@ -1178,6 +1470,11 @@ class ImageToLatentsInvocation(BaseInvocation):
                 # else:
                 #    latents = latents.float()
 
+            elif vae.device.type == "cuda" and torch.cuda.get_device_capability(vae.device)[0] >= 8:
+                # On Ampere and newer, encode under BF16 autocast with FP32 weights (see LatentsToImageInvocation for
+                # rationale).
+                vae.to(dtype=torch.float32)
+                encode_autocast = torch.autocast(device_type="cuda", dtype=torch.bfloat16)
             else:
                 vae.to(dtype=torch.float16)
                 # latents = latents.half()
@@ -1189,7 +1486,11 @@ class ImageToLatentsInvocation(BaseInvocation):
 
             # non_noised_latents_from_image
             image_tensor = image_tensor.to(device=vae.device, dtype=vae.dtype)
-            with torch.inference_mode():
+            if vae.device.type == "cuda":
+                # channels_last keeps the encoder's conv layers Tensor-Core aligned.
+                vae.to(memory_format=torch.channels_last)
+                image_tensor = image_tensor.to(memory_format=torch.channels_last)
+            with torch.inference_mode(), encode_autocast:
                 latents = ImageToLatentsInvocation._encode_to_tensor(vae, image_tensor)
 
             latents = vae.config.scaling_factor * latents
@@ -1205,7 +1506,7 @@ class ImageToLatentsInvocation(BaseInvocation):
 
         image_tensor = image_resized_to_grid_as_tensor(image.convert("RGB"))
         if image_tensor.dim() == 3:
-            image_tensor = einops.rearrange(image_tensor, "c h w -> 1 c h w")
+            image_tensor = image_tensor.unsqueeze(0)  # c h w -> 1 c h w
 
         latents = self.vae_encode(vae_info, self.fp32, self.tiled, image_tensor)
 
@@ -1312,7 +1613,8 @@ class BlendLatentsInvocation(BaseInvocation):
         # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
         blended_latents = blended_latents.to("cpu")
 
-        TorchDevice.empty_cache()
+        if context.config.get().aggressive_empty_cache:
+            TorchDevice.empty_cache()
 
         name = context.tensors.save(tensor=blended_latents)
         return LatentsOutput.build(latents_name=name, latents=blended_latents)
@@ -312,13 +312,11 @@ def prepare_control_image(
             raise NotImplementedError(f"prepare_control_image is not implemented for resize_mode='{resize_mode}'.")
         elif resize_mode == "fill_resize_simple":
             raise NotImplementedError(f"prepare_control_image is not implemented for resize_mode='{resize_mode}'.")
-        nimage = np.array(image)
-        nimage = nimage[None, :]
-        nimage = np.concatenate([nimage], axis=0)
-        # normalizing RGB values to [0,1] range (in PIL.Image they are [0-255])
-        nimage = np.array(nimage).astype(np.float32) / 255.0
-        nimage = nimage.transpose(0, 3, 1, 2)
-        timage = torch.from_numpy(nimage)
+        nimage = np.ascontiguousarray(np.array(image))
+        # Upload as uint8 (4x less transfer traffic than float32), then normalize RGB values from [0-255] to the
+        # [0,1] range on the target device.
+        timage = torch.from_numpy(nimage).to(device=device)
+        timage = timage.permute(2, 0, 1).unsqueeze(0).to(dtype=dtype).div_(255.0)
 
     # use fancy lvmin controlnet resizing
     elif resize_mode == "just_resize" or resize_mode == "crop_resize" or resize_mode == "fill_resize":
@@ -413,8 +413,17 @@ class StableDiffusionGeneratorPipeline(StableDiffusionPipeline):
                     )
                 )
 
+            # If the UNet was wrapped by torch.compile(mode="reduce-overhead"), each denoising step replays captured
+            # CUDA graphs. The step boundary must be marked so that tensors we hold from the previous replay (the
+            # running latents) are preserved before the graph's static buffers are overwritten by the next replay.
+            mark_cudagraph_step = None
+            if hasattr(self.unet, "_orig_mod"):
+                mark_cudagraph_step = getattr(getattr(torch, "compiler", None), "cudagraph_mark_step_begin", None)
+
             # print("timesteps:", timesteps)
             for i, t in enumerate(self.progress_bar(timesteps)):
+                if mark_cudagraph_step is not None:
+                    mark_cudagraph_step()
                 batched_t = t.expand(batch_size)
                 step_output = self.step(
                     batched_t,
@@ -117,6 +117,11 @@ class TextConditioningData:
         # For models trained using zero-terminal SNR ("ztsnr"), it's suggested to use guidance_rescale_multiplier of 0.7.
         # See [Common Diffusion Noise Schedules and Sample Steps are Flawed](https://arxiv.org/pdf/2305.08891.pdf).
         self.guidance_rescale_multiplier = guidance_rescale_multiplier
+        # Lazily-populated cache of the unconditioned and conditioned text embeddings concatenated along the batch
+        # dimension, with the matching encoder attention mask. The concatenated tensors are identical for every
+        # denoising step, so they are computed once on first use and re-used for the rest of the denoising loop.
+        self.batched_embeds: Optional[torch.Tensor] = None
+        self.batched_encoder_attention_mask: Optional[torch.Tensor] = None
 
     def is_sdxl(self):
         assert isinstance(self.uncond_text, SDXLConditioningInfo) == isinstance(self.cond_text, SDXLConditioningInfo)
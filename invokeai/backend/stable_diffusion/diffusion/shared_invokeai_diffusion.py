@@ -123,10 +123,7 @@ class InvokeAIDiffuserComponent:
                     (
                         encoder_hidden_states,
                         encoder_attention_mask,
-                    ) = self._concat_conditionings_for_batch(
-                        conditioning_data.uncond_text.embeds,
-                        conditioning_data.cond_text.embeds,
-                    )
+                    ) = self._get_batched_conditionings(conditioning_data)
                 if isinstance(control_datum.weight, list):
                     # if controlnet has multiple weights, use the weight for the current step
                     controlnet_weight = control_datum.weight[step_index]
@@ -257,6 +254,21 @@ class InvokeAIDiffuserComponent:
 
         return torch.cat([unconditioning, conditioning]), encoder_attention_mask
 
+    def _get_batched_conditionings(self, conditioning_data: TextConditioningData):
+        """Return the batched (uncond + cond) text embeddings and the matching encoder attention mask.
+
+        The concatenation is computed on first use and cached on the conditioning data, since it is identical for
+        every denoising step.
+        """
+        if conditioning_data.batched_embeds is None:
+            (
+                conditioning_data.batched_embeds,
+                conditioning_data.batched_encoder_attention_mask,
+            ) = self._concat_conditionings_for_batch(
+                conditioning_data.uncond_text.embeds, conditioning_data.cond_text.embeds
+            )
+        return conditioning_data.batched_embeds, conditioning_data.batched_encoder_attention_mask
+
     # methods below are called from do_diffusion_step and should be considered private to this class.
 
     def _apply_standard_conditioning(
@@ -337,9 +349,7 @@ class InvokeAIDiffuserComponent:
             )
             cross_attention_kwargs["percent_through"] = step_index / total_step_count
 
-        both_conditionings, encoder_attention_mask = self._concat_conditionings_for_batch(
-            conditioning_data.uncond_text.embeds, conditioning_data.cond_text.embeds
-        )
+        both_conditionings, encoder_attention_mask = self._get_batched_conditionings(conditioning_data)
         both_results = self.model_forward_callback(
             x_twice,
             sigma_twice,